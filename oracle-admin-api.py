@@ -4,19 +4,398 @@ Oracle Admin API v2.0 - Full Service & Code Management
 For MCP-Hub - create, edit, delete, run, diagnose
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_app_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from collections import deque
+from contextlib import contextmanager
+import cProfile
+import io
+import math
+import pstats
+import random
 import subprocess
+import tempfile
 import os
 import sys
+import threading
+import time
 import traceback
+import uuid
 
 app = Flask(__name__)
 CORS(app)
 
+# Paths can be overridden via env (used by oracle-admin-bench.py)
+GROK_VOICE_DIR = os.environ.get('GROK_VOICE_DIR', '/home/ubuntu/grok-voice')
+SYSTEMD_DIR = os.environ.get('SYSTEMD_DIR', '/etc/systemd/system')
+
 # Security: allowed directories for file operations
-ALLOWED_PATHS = ['/home/ubuntu', '/var/www', '/tmp', '/opt', '/etc/systemd/system']
-GROK_VOICE_DIR = '/home/ubuntu/grok-voice'
+ALLOWED_PATHS = ['/home/ubuntu', '/var/www', '/tmp', '/opt', SYSTEMD_DIR]
+
+# ============ TRACING & PROFILING ============
+# Opt-in per request: header "X-Trace: 1" or query "?trace=1".
+# Spans are returned in the JSON body as "_trace" and traced requests slower
+# than TRACE_SLOW_MS are kept in a bounded store (GET /debug/traces).
+
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', 500))
+TRACE_STORE = deque(maxlen=int(os.environ.get('TRACE_STORE_SIZE', 50)))
+TRACE_LOCK = threading.Lock()
+
+# Sampled cProfile, toggled at runtime via POST /debug/profile.
+# Only one request is profiled at a time (cProfile is not concurrent-safe).
+PROFILE = {'enabled': False, 'sample_rate': 0.1, 'requests': 0, 'stats': None}
+PROFILE_LOCK = threading.Lock()
+PROFILE_BUSY = threading.Lock()
+
+@contextmanager
+def span(name, **attrs):
+    """Record a timed span if the current request is traced"""
+    trace = g.get('trace') if has_app_context() else None
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace['spans'].append({
+            'name': name,
+            'start_ms': round((start - trace['start']) * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3),
+            **attrs
+        })
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records serialization as a span"""
+    def dumps(self, obj, **kwargs):
+        with span('json.dumps'):
+            return super().dumps(obj, **kwargs)
+
+app.json = TracedJSONProvider(app)
+
+def trace_requested():
+    flag = request.headers.get('X-Trace') or request.args.get('trace')
+    return flag is not None and flag.lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def start_trace():
+    if trace_requested():
+        g.trace = {
+            'id': uuid.uuid4().hex[:16],
+            'method': request.method,
+            'path': request.path,
+            'start': time.perf_counter(),
+            'spans': []
+        }
+
+@app.after_request
+def finish_trace(response):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+
+    duration_ms = round((time.perf_counter() - trace.pop('start')) * 1000, 3)
+    trace['duration_ms'] = duration_ms
+    trace['status'] = response.status_code
+    trace['timestamp'] = time.time()
+
+    # Per-category totals: subprocess vs file I/O vs JSON encoding
+    totals = {}
+    for s in trace['spans']:
+        category = s['name'].split('.')[0]
+        totals[category] = round(totals.get(category, 0) + s['duration_ms'], 3)
+    trace['totals_ms'] = totals
+
+    if duration_ms >= TRACE_SLOW_MS:
+        with TRACE_LOCK:
+            TRACE_STORE.append(trace)
+
+    timings = [f'{k};dur={v}' for k, v in totals.items()] or [f'total;dur={duration_ms}']
+
+    if response.is_json and not response.direct_passthrough:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            # Re-encode with app.json so the body matches other responses.
+            # The trace is already closed, so this is timed into the header.
+            body['_trace'] = trace
+            start = time.perf_counter()
+            response.set_data(app.json.dumps(body) + '\n')
+            timings.append(f'trace_encode;dur={round((time.perf_counter() - start) * 1000, 3)}')
+
+    response.headers['X-Trace-Id'] = trace['id']
+    response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+# ============ ADMISSION CONTROL ============
+# Bounds concurrent subprocess work so bursts of calls cannot starve the
+# grok-* services on the 1-OCPU VM. Each request class has its own
+# concurrency limit and queue; a global cap bounds all classes together.
+# A class with nothing running is served first when a slot frees up, then
+# waiters go by class priority and arrival. Full queue -> 429 + Retry-After.
+
+ADMISSION_CLASSES = {
+    '/code/run': 'code',
+    '/code/check': 'code',
+    '/services/restart': 'mutate',
+    '/services/stop': 'mutate',
+    '/services/start': 'mutate',
+    '/services/create': 'mutate',
+    '/services/delete': 'mutate',
+    '/services/edit': 'mutate',
+    '/services/list': 'read',
+    '/services/status': 'read',
+    '/services/logs': 'read',
+    '/services/info': 'read',
+    '/services/mapping': 'read',
+    '/diagnose/service': 'read',
+    '/diagnose/all': 'read',
+}
+
+# Lower number = served first when several classes are waiting
+ADMISSION_PRIORITY = {'mutate': 0, 'read': 1, 'code': 2}
+
+ADMISSION_LIMITS = {
+    'code': int(os.environ.get('ADMIT_CODE', 1)),
+    'mutate': int(os.environ.get('ADMIT_MUTATE', 1)),
+    'read': int(os.environ.get('ADMIT_READ', 3)),
+}
+ADMISSION_QUEUE = {
+    'code': int(os.environ.get('ADMIT_QUEUE_CODE', 4)),
+    'mutate': int(os.environ.get('ADMIT_QUEUE_MUTATE', 8)),
+    'read': int(os.environ.get('ADMIT_QUEUE_READ', 16)),
+}
+ADMISSION_TOTAL = int(os.environ.get('ADMIT_TOTAL', 4))
+ADMISSION_TIMEOUT = float(os.environ.get('ADMIT_TIMEOUT', 30))
+
+class Governor:
+    """Per-class concurrency limits with a shared priority queue"""
+
+    def __init__(self, limits, queue_limits, total, timeout, priority):
+        bad = [c for c, n in limits.items() if n < 1]
+        if bad:
+            raise ValueError(f'Admission limit must be >= 1 for: {", ".join(bad)}')
+        if total < 1:
+            raise ValueError('Admission total limit must be >= 1')
+        if any(n < 0 for n in queue_limits.values()):
+            raise ValueError('Admission queue limits must be >= 0')
+
+        self.limits = limits
+        self.queue_limits = queue_limits
+        self.total = total
+        self.timeout = timeout
+        self.priority = priority
+        self.lock = threading.Lock()
+        self.waiters = []
+        self.seq = 0
+        self.running = {c: 0 for c in limits}
+        # *_ewma: exponentially weighted (alpha 0.2), tracks recent load;
+        # *_total: running sums used for the plain means in snapshot()
+        self.stats = {c: {
+            'admitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0,
+            'wait_ms_ewma': 0.0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0,
+            'service_ms_ewma': 0.0, 'service_ms_total': 0.0
+        } for c in limits}
+
+    def _can_run(self, cls):
+        return (self.running[cls] < self.limits[cls] and
+                sum(self.running.values()) < self.total)
+
+    def _dispatch(self):
+        # Called with lock held: hand free slots to the best eligible waiters.
+        # Classes with nothing running go first, so a busy class cannot
+        # keep a lower-priority one out indefinitely.
+        while self.waiters:
+            eligible = [w for w in self.waiters if self._can_run(w['cls'])]
+            if not eligible:
+                return
+            best = min(eligible, key=lambda w: (
+                self.running[w['cls']] > 0, self.priority[w['cls']], w['seq']
+            ))
+            self.waiters.remove(best)
+            self.running[best['cls']] += 1
+            best['granted'] = True
+            best['event'].set()
+
+    def _queued(self, cls):
+        return sum(1 for w in self.waiters if w['cls'] == cls)
+
+    def retry_after(self, cls):
+        """Seconds until a queued slot is likely free (at least 1)"""
+        with self.lock:
+            return self._retry_after(cls)
+
+    def _retry_after(self, cls):
+        backlog = self._queued(cls) + self.running[cls]
+        service_s = self.stats[cls]['service_ms_ewma'] / 1000 or 1.0
+        return max(1, math.ceil(backlog * service_s / self.limits[cls]))
+
+    def acquire(self, cls):
+        """Block until admitted; return wait in ms, or None if shed"""
+        start = time.perf_counter()
+        with self.lock:
+            if self._queued(cls) >= self.queue_limits[cls] and not self._can_run(cls):
+                self.stats[cls]['rejected'] += 1
+                return None
+            self.seq += 1
+            waiter = {'cls': cls, 'seq': self.seq, 'granted': False,
+                      'event': threading.Event()}
+            self.waiters.append(waiter)
+            self._dispatch()
+            if waiter['granted']:
+                self._record_wait(cls, 0.0)
+                return 0.0
+
+        waiter['event'].wait(self.timeout)
+        with self.lock:
+            if not waiter['granted']:
+                self.waiters.remove(waiter)
+                self.stats[cls]['timeouts'] += 1
+                return None
+            wait_ms = (time.perf_counter() - start) * 1000
+            self._record_wait(cls, wait_ms)
+            return wait_ms
+
+    def release(self, cls, service_ms):
+        with self.lock:
+            self.running[cls] -= 1
+            st = self.stats[cls]
+            st['completed'] += 1
+            st['service_ms_total'] += service_ms
+            st['service_ms_ewma'] = service_ms if st['completed'] == 1 else \
+                0.8 * st['service_ms_ewma'] + 0.2 * service_ms
+            self._dispatch()
+
+    def _record_wait(self, cls, wait_ms):
+        st = self.stats[cls]
+        st['admitted'] += 1
+        st['wait_ms_total'] += wait_ms
+        st['wait_ms_ewma'] = wait_ms if st['admitted'] == 1 else \
+            0.8 * st['wait_ms_ewma'] + 0.2 * wait_ms
+        st['wait_ms_max'] = max(st['wait_ms_max'], wait_ms)
+
+    def snapshot(self):
+        with self.lock:
+            classes = {}
+            for cls in self.limits:
+                st = self.stats[cls]
+                classes[cls] = {
+                    'running': self.running[cls],
+                    'queued': self._queued(cls),
+                    'limit': self.limits[cls],
+                    'queue_limit': self.queue_limits[cls],
+                    'retry_after': self._retry_after(cls),
+                    'admitted': st['admitted'],
+                    'completed': st['completed'],
+                    'rejected': st['rejected'],
+                    'timeouts': st['timeouts'],
+                    'wait_ms_mean': round(st['wait_ms_total'] / st['admitted'], 2)
+                                    if st['admitted'] else 0.0,
+                    'wait_ms_ewma': round(st['wait_ms_ewma'], 2),
+                    'wait_ms_max': round(st['wait_ms_max'], 2),
+                    'service_ms_mean': round(st['service_ms_total'] / st['completed'], 2)
+                                       if st['completed'] else 0.0,
+                    'service_ms_ewma': round(st['service_ms_ewma'], 2)
+                }
+            return {
+                'classes': classes,
+                'running': sum(self.running.values()),
+                'queued': len(self.waiters),
+                'total_limit': self.total,
+                'queue_timeout': self.timeout
+            }
+
+governor = Governor(ADMISSION_LIMITS, ADMISSION_QUEUE, ADMISSION_TOTAL,
+                    ADMISSION_TIMEOUT, ADMISSION_PRIORITY)
+
+def admission_class():
+    """Admission class for the matched route, or None if not governed"""
+    # Preflights and requests that will 404/405 never run a subprocess
+    if request.method == 'OPTIONS' or request.url_rule is None:
+        return None
+    if request.method not in request.url_rule.methods:
+        return None
+    return ADMISSION_CLASSES.get(request.url_rule.rule)
+
+@app.before_request
+def admit_request():
+    cls = admission_class()
+    if cls is None:
+        return None
+
+    with span('admission.wait', cls=cls):
+        wait_ms = governor.acquire(cls)
+
+    if wait_ms is None:
+        retry_after = governor.retry_after(cls)
+        response = jsonify({
+            'error': 'Server busy, try again later',
+            'class': cls,
+            'retry_after': retry_after
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    g.admission = {'cls': cls, 'start': time.perf_counter()}
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    admission = g.pop('admission', None)
+    if admission is not None:
+        service_ms = (time.perf_counter() - admission['start']) * 1000
+        governor.release(admission['cls'], service_ms)
+
+# Registered after admit_request so queue time is never profiled and
+# PROFILE_BUSY is not held while a request waits for a slot.
+@app.before_request
+def start_profile():
+    if PROFILE['enabled'] and random.random() < PROFILE['sample_rate']:
+        if PROFILE_BUSY.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+@app.teardown_request
+def finish_profile(exc):
+    # teardown (not after_request) so the profiler is released even on errors
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    PROFILE_BUSY.release()
+    with PROFILE_LOCK:
+        if PROFILE['stats'] is None:
+            PROFILE['stats'] = pstats.Stats(profiler)
+        else:
+            PROFILE['stats'].add(profiler)
+        PROFILE['requests'] += 1
+
+def read_text(path, errors=None):
+    """Read a text file (traced as file.read)"""
+    with span('file.read', path=path):
+        with open(path, 'r', encoding='utf-8', errors=errors) as f:
+            return f.read()
+
+def write_text(path, content):
+    """Write a text file (traced as file.write)"""
+    with span('file.write', path=path, size=len(content)):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+def write_temp_py(content):
+    """Write content to a unique temp .py file (traced as file.write)"""
+    with span('file.write', size=len(content)):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', prefix='mcp_code_',
+                                         encoding='utf-8', delete=False) as f:
+            f.write(content)
+    return f.name
+
+def remove_file(path):
+    """Remove a file (traced as file.delete)"""
+    with span('file.delete', path=path):
+        os.remove(path)
 
 def is_path_allowed(path):
     """Check if path is within allowed directories"""
@@ -26,10 +405,11 @@ def is_path_allowed(path):
 def run_cmd(cmd, timeout=30):
     """Run shell command and return result"""
     try:
-        result = subprocess.run(
-            cmd, shell=True, capture_output=True,
-            text=True, timeout=timeout
-        )
+        with span('run_cmd', cmd=cmd):
+            result = subprocess.run(
+                cmd, shell=True, capture_output=True,
+                text=True, timeout=timeout
+            )
         return {
             'success': result.returncode == 0,
             'stdout': result.stdout,
@@ -57,15 +437,16 @@ def list_files():
 
     try:
         items = []
-        for item in os.listdir(path):
-            full_path = os.path.join(path, item)
-            is_dir = os.path.isdir(full_path)
-            size = 0 if is_dir else os.path.getsize(full_path)
-            items.append({
-                'name': item,
-                'type': 'directory' if is_dir else 'file',
-                'size': size
-            })
+        with span('file.list', path=path):
+            for item in os.listdir(path):
+                full_path = os.path.join(path, item)
+                is_dir = os.path.isdir(full_path)
+                size = 0 if is_dir else os.path.getsize(full_path)
+                items.append({
+                    'name': item,
+                    'type': 'directory' if is_dir else 'file',
+                    'size': size
+                })
         return jsonify({'path': path, 'items': items, 'count': len(items)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -92,8 +473,7 @@ def read_file():
         if os.path.getsize(path) > 1024 * 1024:
             return jsonify({'error': 'File too large (max 1MB)'}), 400
 
-        with open(path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        content = read_text(path, errors='replace')
         return jsonify({'path': path, 'content': content, 'size': len(content)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -116,8 +496,7 @@ def write_file():
         if dir_path and not os.path.exists(dir_path):
             os.makedirs(dir_path, exist_ok=True)
 
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text(path, content)
         return jsonify({'success': True, 'path': path, 'size': len(content)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -140,9 +519,10 @@ def delete_file():
     try:
         if os.path.isdir(path):
             import shutil
-            shutil.rmtree(path)
+            with span('file.delete', path=path):
+                shutil.rmtree(path)
         else:
-            os.remove(path)
+            remove_file(path)
         return jsonify({'success': True, 'deleted': path})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -275,8 +655,7 @@ def create_service():
     try:
         # 1. Save Python file
         py_file = f'{GROK_VOICE_DIR}/{name}.py'
-        with open(py_file, 'w', encoding='utf-8') as f:
-            f.write(python_code)
+        write_text(py_file, python_code)
 
         # 2. Create service file
         env_lines = '\n'.join([f'Environment={k}={v}' for k, v in env_vars.items()])
@@ -299,12 +678,11 @@ RestartSec=3
 WantedBy=multi-user.target
 '''
 
-        service_file = f'/etc/systemd/system/{name}.service'
+        service_file = f'{SYSTEMD_DIR}/{name}.service'
 
         # Write service file via sudo
         tmp_service = f'/tmp/{name}.service'
-        with open(tmp_service, 'w') as f:
-            f.write(service_content)
+        write_text(tmp_service, service_content)
 
         run_cmd(f'sudo mv {tmp_service} {service_file}')
         run_cmd('sudo systemctl daemon-reload')
@@ -346,14 +724,14 @@ def delete_service():
         run_cmd(f'sudo systemctl disable {service}')
 
         # Remove service file
-        service_file = f'/etc/systemd/system/{service}.service'
+        service_file = f'{SYSTEMD_DIR}/{service}.service'
         if os.path.exists(service_file):
             run_cmd(f'sudo rm {service_file}')
 
         # Remove Python file if requested
         py_file = f'{GROK_VOICE_DIR}/{service}.py'
         if delete_files and os.path.exists(py_file):
-            os.remove(py_file)
+            remove_file(py_file)
 
         run_cmd('sudo systemctl daemon-reload')
 
@@ -389,8 +767,7 @@ def edit_service():
             run_cmd(f'cp {py_file} {backup}')
 
         # Write new code
-        with open(py_file, 'w', encoding='utf-8') as f:
-            f.write(new_code)
+        write_text(py_file, new_code)
 
         # Restart if requested
         if restart:
@@ -423,15 +800,13 @@ def run_code():
         return jsonify({'error': 'Code required'}), 400
 
     try:
-        # Save to temp file
-        tmp_file = '/tmp/mcp_run_code.py'
-        with open(tmp_file, 'w', encoding='utf-8') as f:
-            f.write(code)
-
-        # Run with timeout
-        result = run_cmd(f'cd {GROK_VOICE_DIR} && python3 {tmp_file}', timeout=timeout)
-
-        os.remove(tmp_file)
+        # Save to a per-request temp file (concurrent runs must not collide)
+        tmp_file = write_temp_py(code)
+        try:
+            # Run with timeout
+            result = run_cmd(f'cd {GROK_VOICE_DIR} && python3 {tmp_file}', timeout=timeout)
+        finally:
+            remove_file(tmp_file)
 
         return jsonify({
             'success': result['success'],
@@ -453,15 +828,13 @@ def check_code():
         return jsonify({'error': 'Code required'}), 400
 
     try:
-        # Save to temp file
-        tmp_file = '/tmp/mcp_check_code.py'
-        with open(tmp_file, 'w', encoding='utf-8') as f:
-            f.write(code)
-
-        # Check syntax
-        result = run_cmd(f'python3 -m py_compile {tmp_file}')
-
-        os.remove(tmp_file)
+        # Save to a per-request temp file (concurrent checks must not collide)
+        tmp_file = write_temp_py(code)
+        try:
+            # Check syntax
+            result = run_cmd(f'python3 -m py_compile {tmp_file}')
+        finally:
+            remove_file(tmp_file)
 
         if result['success']:
             return jsonify({'valid': True, 'message': 'Syntax OK'})
@@ -492,7 +865,7 @@ def diagnose_service():
         }
 
         # 1. Check if service exists
-        service_file = f'/etc/systemd/system/{service}.service'
+        service_file = f'{SYSTEMD_DIR}/{service}.service'
         diagnosis['service_file_exists'] = os.path.exists(service_file)
 
         # 2. Check Python file
@@ -522,8 +895,7 @@ def diagnose_service():
 
         # 7. Check port if in service file
         if diagnosis['service_file_exists']:
-            with open(service_file, 'r') as f:
-                service_content = f.read()
+            service_content = read_text(service_file)
             diagnosis['service_config'] = service_content
 
         # Summary
@@ -597,10 +969,9 @@ def service_info():
         info = {'service': service}
 
         # Read service file
-        service_file = f'/etc/systemd/system/{service}.service'
+        service_file = f'{SYSTEMD_DIR}/{service}.service'
         if os.path.exists(service_file):
-            with open(service_file, 'r') as f:
-                content = f.read()
+            content = read_text(service_file)
             info['service_file'] = content
 
             # Extract Python file from ExecStart
@@ -640,14 +1011,15 @@ def services_mapping():
         mapping = []
 
         # List all grok-* service files
-        service_dir = '/etc/systemd/system'
-        for filename in os.listdir(service_dir):
+        service_dir = SYSTEMD_DIR
+        with span('file.list', path=service_dir):
+            filenames = os.listdir(service_dir)
+        for filename in filenames:
             if filename.startswith('grok-') and filename.endswith('.service'):
                 service_name = filename.replace('.service', '')
                 service_path = os.path.join(service_dir, filename)
 
-                with open(service_path, 'r') as f:
-                    content = f.read()
+                content = read_text(service_path)
 
                 entry = {'service': service_name, 'service_file': service_path}
 
@@ -698,8 +1070,7 @@ def deploy_html():
         else:
             deploy_path = f'/var/www/html/{filename}'
 
-        with open(deploy_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text(deploy_path, content)
 
         return jsonify({
             'success': True,
@@ -709,6 +1080,92 @@ def deploy_html():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============ ADMISSION STATS ============
+
+@app.route('/admission', methods=['GET'])
+def admission_stats():
+    """Queue depths, running counts and wait times per request class"""
+    return jsonify(governor.snapshot())
+
+# ============ DEBUG: TRACES & PROFILING ============
+
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    """Recent slow traced requests, slowest first"""
+    limit = request.args.get('limit', 20, type=int)
+    path = request.args.get('path')
+    with TRACE_LOCK:
+        traces = list(TRACE_STORE)
+    if path:
+        traces = [t for t in traces if t['path'] == path]
+    traces.sort(key=lambda t: t['duration_ms'], reverse=True)
+    return jsonify({
+        'traces': traces[:limit],
+        'count': len(traces),
+        'slow_ms': TRACE_SLOW_MS,
+        'capacity': TRACE_STORE.maxlen
+    })
+
+@app.route('/debug/traces', methods=['DELETE'])
+def clear_traces():
+    """Clear the slow trace store"""
+    with TRACE_LOCK:
+        TRACE_STORE.clear()
+    return jsonify({'success': True})
+
+@app.route('/debug/profile', methods=['GET'])
+def get_profile():
+    """Aggregated cProfile stats from sampled requests"""
+    limit = request.args.get('limit', 30, type=int)
+    sort = request.args.get('sort', 'cumulative')
+    result = {
+        'enabled': PROFILE['enabled'],
+        'sample_rate': PROFILE['sample_rate'],
+        'requests': PROFILE['requests']
+    }
+    with PROFILE_LOCK:
+        if PROFILE['stats'] is not None:
+            out = io.StringIO()
+            PROFILE['stats'].stream = out
+            try:
+                PROFILE['stats'].sort_stats(sort).print_stats(limit)
+            except KeyError:
+                return jsonify({'error': f'Invalid sort key: {sort}'}), 400
+            result['stats'] = out.getvalue()
+    return jsonify(result)
+
+@app.route('/debug/profile', methods=['POST'])
+def set_profile():
+    """Toggle sampled profiling at runtime: {enabled, sample_rate, reset}"""
+    data = request.get_json() or {}
+
+    # Validate everything before applying, so a bad field changes nothing
+    if 'enabled' in data and not isinstance(data['enabled'], bool):
+        return jsonify({'error': 'enabled must be true or false'}), 400
+
+    if 'sample_rate' in data:
+        try:
+            rate = float(data['sample_rate'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'sample_rate must be a number'}), 400
+        if not 0 < rate <= 1:
+            return jsonify({'error': 'sample_rate must be in (0, 1]'}), 400
+        PROFILE['sample_rate'] = rate
+
+    if 'enabled' in data:
+        PROFILE['enabled'] = data['enabled']
+
+    if data.get('reset'):
+        with PROFILE_LOCK:
+            PROFILE['stats'] = None
+            PROFILE['requests'] = 0
+
+    return jsonify({
+        'enabled': PROFILE['enabled'],
+        'sample_rate': PROFILE['sample_rate'],
+        'requests': PROFILE['requests']
+    })
+
 # ============ HEALTH CHECK ============
 
 @app.route('/health', methods=['GET'])
@@ -717,8 +1174,8 @@ def health():
         'status': 'ok',
         'name': 'Oracle Admin API',
         'version': '2.0',
-        'features': ['files', 'services', 'deploy', 'code', 'diagnose']
+        'features': ['files', 'services', 'deploy', 'code', 'diagnose', 'trace', 'profile', 'admission']
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5001)), debug=False)
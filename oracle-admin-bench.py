@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Oracle Admin API Benchmark - load test with fake systemd
+Runs oracle-admin-api.py against stand-in systemctl/journalctl/sudo
+and writes throughput + p50/p95/p99 latency per route group to JSON.
+
+Usage:
+    python3 oracle-admin-bench.py --units 20 --log-lines 500 --latency-ms 15
+    python3 oracle-admin-bench.py --groups services,diagnose --concurrency 16
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oracle-admin-api.py')
+
+# ============ FAKE SYSTEMD ============
+
+# One script serves systemctl, journalctl and sudo (dispatch on argv[0]).
+# Behaviour is driven by BENCH_UNITS / BENCH_LOG_LINES / BENCH_LATENCY_MS.
+FAKE_TOOL = r'''
+import os
+import sys
+import time
+
+UNITS = int(os.environ.get('BENCH_UNITS', '10'))
+LOG_LINES = int(os.environ.get('BENCH_LOG_LINES', '100'))
+LATENCY = int(os.environ.get('BENCH_LATENCY_MS', '0')) / 1000.0
+
+def systemctl(args):
+    if not args:
+        return 1
+    cmd = args[0]
+    if cmd == 'list-units':
+        print('  UNIT                     LOAD   ACTIVE SUB     DESCRIPTION')
+        for i in range(UNITS):
+            print(f'  grok-bench-{i}.service   loaded active running Bench unit {i}')
+        print(f'\n{UNITS} loaded units listed.')
+    elif cmd == 'status':
+        name = args[1] if len(args) > 1 else 'unknown'
+        print(f'* {name}.service - Bench unit')
+        print(f'     Loaded: loaded (/etc/systemd/system/{name}.service; enabled)')
+        print('     Active: active (running) since Mon 2026-01-01 00:00:00 UTC')
+        print('   Main PID: 4242 (python3)')
+        for i in range(min(LOG_LINES, 10)):
+            print(f'Jan 01 00:00:{i:02d} vm1 python3[4242]: status line {i}')
+    elif cmd == 'is-active':
+        print('active')
+    return 0
+
+def journalctl(args):
+    lines = LOG_LINES
+    if '-n' in args:
+        try:
+            lines = min(int(args[args.index('-n') + 1]), LOG_LINES)
+        except (IndexError, ValueError):
+            pass
+    unit = args[args.index('-u') + 1] if '-u' in args else 'grok-bench'
+    for i in range(lines):
+        print(f'Jan 01 00:00:00 vm1 {unit}[4242]: log line {i} ' + 'x' * 64)
+    return 0
+
+def main():
+    tool = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    if tool == 'sudo':
+        if not args:
+            return 1
+        os.execvp(args[0], args)
+    time.sleep(LATENCY)
+    if tool == 'systemctl':
+        return systemctl(args)
+    if tool == 'journalctl':
+        return journalctl(args)
+    return 127
+
+sys.exit(main())
+'''
+
+UNIT_TEMPLATE = '''[Unit]
+Description=Bench unit {i}
+After=network.target
+
+[Service]
+Type=simple
+User=ubuntu
+WorkingDirectory={voice_dir}
+ExecStart=/usr/bin/python3 {voice_dir}/grok-bench-{i}.py --port={port}
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+'''
+
+def build_sandbox(root, units):
+    """Create fake bin/, systemd/ and grok-voice/ dirs under root"""
+    bin_dir = os.path.join(root, 'bin')
+    systemd_dir = os.path.join(root, 'systemd')
+    voice_dir = os.path.join(root, 'grok-voice')
+    for d in (bin_dir, systemd_dir, voice_dir):
+        os.makedirs(d, exist_ok=True)
+
+    for tool in ('systemctl', 'journalctl', 'sudo'):
+        path = os.path.join(bin_dir, tool)
+        with open(path, 'w') as f:
+            f.write(f'#!{sys.executable}\n{FAKE_TOOL}')
+        os.chmod(path, 0o755)
+
+    for i in range(units):
+        with open(os.path.join(systemd_dir, f'grok-bench-{i}.service'), 'w') as f:
+            f.write(UNIT_TEMPLATE.format(i=i, voice_dir=voice_dir, port=6000 + i))
+        with open(os.path.join(voice_dir, f'grok-bench-{i}.py'), 'w') as f:
+            f.write(f'print("bench unit {i}")\n')
+
+    return bin_dir, systemd_dir, voice_dir
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_api(root, args):
+    """Start oracle-admin-api.py with the fake tools first on PATH"""
+    bin_dir, systemd_dir, voice_dir = build_sandbox(root, args.units)
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'PATH': bin_dir + os.pathsep + env.get('PATH', ''),
+        'PORT': str(port),
+        'SYSTEMD_DIR': systemd_dir,
+        'GROK_VOICE_DIR': voice_dir,
+        'BENCH_UNITS': str(args.units),
+        'BENCH_LOG_LINES': str(args.log_lines),
+        'BENCH_LATENCY_MS': str(args.latency_ms),
+    })
+    # e.g. --admit total=8 --admit timeout=120 -> ADMIT_TOTAL=8 ADMIT_TIMEOUT=120
+    for key, value in args.admit.items():
+        env[f'ADMIT_{key.upper()}'] = value
+    # Log to a file, not a pipe: Flask logs every request and would fill it
+    log_path = os.path.join(root, 'api.log')
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen(
+            [sys.executable, API_SCRIPT], env=env,
+            stdout=subprocess.DEVNULL, stderr=log
+        )
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            with open(log_path, errors='replace') as f:
+                output = f.read()[-4000:]
+            raise RuntimeError(f'API exited with code {proc.returncode}:\n{output}')
+        try:
+            urllib.request.urlopen(url + '/health', timeout=1).read()
+            return proc, url, voice_dir
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('API did not become healthy in 15s')
+
+# ============ LOAD GENERATION ============
+
+GROUP_NAMES = ('files', 'services', 'diagnose', 'code')
+
+# --admit KEY=N settings the API understands: key -> (type, minimum)
+ADMIT_SETTINGS = {
+    'code': (int, 1),
+    'mutate': (int, 1),
+    'read': (int, 1),
+    'total': (int, 1),
+    'queue_code': (int, 0),
+    'queue_mutate': (int, 0),
+    'queue_read': (int, 0),
+    'timeout': (float, 1),
+}
+
+# Warn when more than this share of a group is shed: its stats are thin
+SHED_WARN_RATIO = 0.25
+
+def parse_admit(items, concurrency):
+    """Validate --admit KEY=N items into ADMIT_* values (raises ValueError)"""
+    admit = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        key = key.strip().lower()
+        if not sep or key not in ADMIT_SETTINGS:
+            raise ValueError(f'Invalid --admit value: {item} '
+                             f'(known keys: {", ".join(ADMIT_SETTINGS)})')
+        kind, minimum = ADMIT_SETTINGS[key]
+        try:
+            number = kind(value)
+        except ValueError:
+            raise ValueError(f'Invalid --admit value: {item} (expected a number)')
+        if number < minimum:
+            raise ValueError(f'Invalid --admit value: {item} ({key} must be >= {minimum})')
+        admit[key] = str(number)
+
+    # Size queues to the client count by default, so the bench measures the
+    # API rather than how fast it sheds load
+    for key in ('queue_code', 'queue_mutate', 'queue_read'):
+        admit.setdefault(key, str(concurrency))
+    return admit
+
+def route_groups(voice_dir, scratch_dir):
+    """Requests per route group: (method, path, json body)"""
+    unit = 'grok-bench-0'
+    return {
+        'files': [
+            ('POST', '/files/list', {'path': voice_dir}),
+            ('POST', '/files/read', {'path': os.path.join(voice_dir, f'{unit}.py')}),
+            ('POST', '/files/write', {'path': os.path.join(scratch_dir, 'bench.txt'), 'content': 'x' * 4096}),
+        ],
+        'services': [
+            ('GET', '/services/list', None),
+            ('POST', '/services/status', {'service': unit}),
+            ('POST', '/services/logs', {'service': unit, 'lines': 200}),
+            ('POST', '/services/restart', {'service': unit}),
+            ('POST', '/services/info', {'service': unit}),
+            ('GET', '/services/mapping', None),
+        ],
+        'diagnose': [
+            ('POST', '/diagnose/service', {'service': unit}),
+            ('GET', '/diagnose/all', None),
+        ],
+        'code': [
+            ('POST', '/code/check', {'code': 'print(1 + 1)\n'}),
+            ('POST', '/code/run', {'code': 'print(sum(range(1000)))\n', 'timeout': 10}),
+        ],
+    }
+
+def send(url, method, path, body):
+    """Send one request, return (latency_ms, status) - status 0 on network error"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url + path, data=data, method=method)
+    if data is not None:
+        req.add_header('Content-Type', 'application/json')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = 0
+    return (time.perf_counter() - start) * 1000, status
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def latency_stats(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': round(percentile(latencies, 50), 2),
+        'p95': round(percentile(latencies, 95), 2),
+        'p99': round(percentile(latencies, 99), 2),
+        'mean': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'max': round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+def summarize(samples, duration):
+    # 429 = shed by admission control. Shed responses are fast and would
+    # skew throughput/percentiles, so those cover admitted requests only.
+    admitted = [(lat, status) for lat, status in samples if status != 429]
+    shed = [lat for lat, status in samples if status == 429]
+    errors = sum(1 for _, status in admitted if status >= 400 or status == 0)
+    return {
+        'requests': len(samples),
+        'admitted': len(admitted),
+        'errors': errors,
+        'shed': len(shed),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(admitted) / duration, 2) if duration > 0 else 0.0,
+        'latency_ms': latency_stats(lat for lat, _ in admitted),
+        'shed_latency_ms': latency_stats(shed)
+    }
+
+def run_group(url, requests, total, concurrency):
+    """Drive `total` requests round-robin over the group's routes"""
+    samples = {path: [] for _, path, _ in requests}
+    lock = threading.Lock()
+
+    def worker(i):
+        method, path, body = requests[i % len(requests)]
+        result = send(url, method, path, body)
+        with lock:
+            samples[path].append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total)))
+    duration = time.perf_counter() - start
+
+    all_samples = [s for route in samples.values() for s in route]
+    report = summarize(all_samples, duration)
+    report['routes'] = {path: summarize(route, duration) for path, route in samples.items()}
+    return report
+
+# ============ MAIN ============
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark oracle-admin-api.py against fake systemd')
+    parser.add_argument('--units', type=int, default=10, help='number of fake grok-* units')
+    parser.add_argument('--log-lines', type=int, default=100, help='max journal lines per fake journalctl call')
+    parser.add_argument('--latency-ms', type=int, default=5, help='added latency per fake systemctl/journalctl call')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route group')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--groups', default='files,services,diagnose,code', help='comma-separated route groups')
+    parser.add_argument('--output', default='bench_output.json', help='JSON report path')
+    parser.add_argument('--admit', action='append', default=[], metavar='KEY=N',
+                        help='admission setting passed as ADMIT_<KEY>, e.g. total=8, timeout=120')
+    args = parser.parse_args()
+
+    try:
+        args.admit = parse_admit(args.admit, args.concurrency)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    # Validate groups up front so a typo doesn't waste a run without a report
+    selected = [name.strip() for name in args.groups.split(',') if name.strip()]
+    unknown = [name for name in selected if name not in GROUP_NAMES]
+    if unknown or not selected:
+        print(f'Unknown group: {", ".join(unknown) or "(none)"} '
+              f'(known: {", ".join(GROUP_NAMES)})', file=sys.stderr)
+        return 2
+
+    root = tempfile.mkdtemp(prefix='admin-bench-', dir='/tmp')
+    proc = None
+    try:
+        try:
+            proc, url, voice_dir = start_api(root, args)
+        except RuntimeError as e:
+            print(f'Failed to start API: {e}', file=sys.stderr)
+            return 1
+        scratch_dir = os.path.join(root, 'scratch')
+        os.makedirs(scratch_dir, exist_ok=True)
+        groups = route_groups(voice_dir, scratch_dir)
+
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'config': {
+                'units': args.units,
+                'log_lines': args.log_lines,
+                'latency_ms': args.latency_ms,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'admit': args.admit,
+                'python': sys.version.split()[0],
+                'cpus': os.cpu_count(),
+            },
+            'groups': {}
+        }
+
+        for name in selected:
+            result = run_group(url, groups[name], args.requests, args.concurrency)
+            report['groups'][name] = result
+            lat = result['latency_ms']
+            print(f'{name:<10} {result["throughput_rps"]:>8.1f} req/s  '
+                  f'p50={lat["p50"]:.1f}ms p95={lat["p95"]:.1f}ms p99={lat["p99"]:.1f}ms  '
+                  f'errors={result["errors"]} shed={result["shed"]}')
+            if result['shed'] > SHED_WARN_RATIO * result['requests']:
+                print(f'WARNING: {name}: {result["shed"]}/{result["requests"]} requests shed (429), '
+                      f'latency stats cover only {result["admitted"]} - raise --admit limits',
+                      file=sys.stderr)
+
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report written to {args.output}')
+        return 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Tests for oracle-admin-api.py admission, tracing and profiling (run: python3 -m pytest -q)"""
+
+import importlib.util
+import os
+import threading
+import time
+import unittest
+from collections import deque
+from unittest import mock
+
+spec = importlib.util.spec_from_file_location(
+    'oracle_admin_api',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oracle-admin-api.py')
+)
+api = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(api)
+
+PRIORITY = {'mutate': 0, 'read': 1, 'code': 2}
+
+def make_governor(limits=None, queues=None, total=2, timeout=2.0):
+    limits = limits or {'code': 1, 'mutate': 1, 'read': 2}
+    queues = queues or {'code': 2, 'mutate': 2, 'read': 4}
+    return api.Governor(limits, queues, total, timeout, PRIORITY)
+
+def wait_queued(gov, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if gov.snapshot()['queued'] >= count:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f'expected {count} queued waiters')
+
+class Waiter(threading.Thread):
+    """Acquire a class slot in the background and record when it got in"""
+
+    def __init__(self, gov, cls, order):
+        super().__init__(daemon=True)
+        self.gov, self.cls, self.order = gov, cls, order
+        self.result = 'pending'
+
+    def run(self):
+        self.result = self.gov.acquire(self.cls)
+        if self.result is not None:
+            self.order.append(self.cls)
+
+class GovernorTest(unittest.TestCase):
+
+    def test_fast_path_admits_without_waiting(self):
+        gov = make_governor()
+        self.assertEqual(gov.acquire('read'), 0.0)
+        snap = gov.snapshot()
+        self.assertEqual(snap['classes']['read']['running'], 1)
+        self.assertEqual(snap['classes']['read']['admitted'], 1)
+
+    def test_full_queue_is_rejected(self):
+        gov = make_governor(queues={'code': 0, 'mutate': 2, 'read': 4})
+        gov.acquire('code')
+        self.assertIsNone(gov.acquire('code'))
+        self.assertEqual(gov.snapshot()['classes']['code']['rejected'], 1)
+
+    def test_zero_queue_still_admits_when_free(self):
+        gov = make_governor(queues={'code': 0, 'mutate': 0, 'read': 0})
+        self.assertEqual(gov.acquire('code'), 0.0)
+
+    def test_wait_timeout_returns_none_and_dequeues(self):
+        gov = make_governor(timeout=0.05)
+        gov.acquire('code')
+        self.assertIsNone(gov.acquire('code'))
+        snap = gov.snapshot()
+        self.assertEqual(snap['classes']['code']['timeouts'], 1)
+        self.assertEqual(snap['queued'], 0)
+
+    def test_release_hands_slot_to_waiter(self):
+        gov = make_governor()
+        gov.acquire('code')
+        order = []
+        w = Waiter(gov, 'code', order)
+        w.start()
+        wait_queued(gov, 1)
+        gov.release('code', 10)
+        w.join(2)
+        self.assertIsNotNone(w.result)
+        self.assertGreater(w.result, 0)
+        self.assertEqual(gov.snapshot()['classes']['code']['running'], 1)
+
+    def test_priority_orders_waiters(self):
+        gov = make_governor(limits={'code': 2, 'mutate': 1, 'read': 1}, total=2)
+        gov.acquire('code')
+        gov.acquire('code')
+        order = []
+        read = Waiter(gov, 'read', order)
+        read.start()
+        wait_queued(gov, 1)
+        mutate = Waiter(gov, 'mutate', order)
+        mutate.start()
+        wait_queued(gov, 2)
+
+        # Neither class is running, so priority decides despite arrival order
+        gov.release('code', 10)
+        mutate.join(2)
+        self.assertEqual(order, ['mutate'])
+        gov.release('code', 10)
+        read.join(2)
+        self.assertEqual(order, ['mutate', 'read'])
+
+    def test_code_admitted_while_read_saturated(self):
+        gov = make_governor(limits={'code': 1, 'mutate': 1, 'read': 3}, total=4)
+        for _ in range(3):
+            gov.acquire('read')
+        gov.acquire('mutate')
+
+        order = []
+        code = Waiter(gov, 'code', order)
+        code.start()
+        wait_queued(gov, 1)
+        read = Waiter(gov, 'read', order)
+        read.start()
+        wait_queued(gov, 2)
+
+        # A later, higher-priority read must not take the freed slot
+        gov.release('read', 10)
+        code.join(2)
+        self.assertEqual(order, ['code'])
+        self.assertEqual(read.result, 'pending')
+
+        gov.release('read', 10)
+        read.join(2)
+        self.assertEqual(order, ['code', 'read'])
+
+    def test_retry_after_uses_service_time(self):
+        gov = make_governor(queues={'code': 0, 'mutate': 2, 'read': 4})
+        self.assertEqual(gov.retry_after('code'), 1)
+        gov.acquire('code')
+        gov.release('code', 3000)
+        gov.acquire('code')
+        # one running at ~3s each with limit 1
+        self.assertEqual(gov.retry_after('code'), 3)
+
+    def test_snapshot_reports_mean_and_ewma(self):
+        gov = make_governor()
+        for service_ms in (100, 200, 600):
+            gov.acquire('read')
+            gov.release('read', service_ms)
+        read = gov.snapshot()['classes']['read']
+        self.assertEqual(read['completed'], 3)
+        self.assertEqual(read['service_ms_mean'], 300.0)
+        # 100 -> 0.8*100 + 0.2*200 = 120 -> 0.8*120 + 0.2*600 = 216
+        self.assertEqual(read['service_ms_ewma'], 216.0)
+
+    def test_limits_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            make_governor(limits={'code': 0, 'mutate': 1, 'read': 1})
+        with self.assertRaises(ValueError):
+            make_governor(total=0)
+
+class AdmissionRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        api.governor.acquire('code')
+
+    def tearDown(self):
+        api.governor.release('code', 0)
+
+    def test_preflight_and_wrong_method_bypass_queue(self):
+        timeouts = api.governor.snapshot()['classes']['code']['timeouts']
+
+        start = time.perf_counter()
+        resp = self.client.options('/code/run', headers={
+            'Origin': 'http://example.com',
+            'Access-Control-Request-Method': 'POST'
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.client.get('/code/run').status_code, 405)
+        self.assertLess(time.perf_counter() - start, 1)
+
+        snap = api.governor.snapshot()
+        self.assertEqual(snap['classes']['code']['queued'], 0)
+        self.assertEqual(snap['classes']['code']['timeouts'], timeouts)
+
+class TracingRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = api.app.test_client()
+
+    def check_code(self, **kwargs):
+        return self.client.post('/code/check', json={'code': 'print(1)\n'}, **kwargs)
+
+    def test_untraced_request_has_no_trace(self):
+        resp = self.check_code()
+        self.assertNotIn('_trace', resp.get_json())
+        self.assertNotIn('Server-Timing', resp.headers)
+
+    def test_query_flag_adds_trace_and_server_timing(self):
+        resp = self.client.post('/code/check?trace=1', json={'code': 'print(1)\n'})
+        body = resp.get_json()
+        self.assertTrue(body['valid'])
+        trace = body['_trace']
+        self.assertEqual(trace['path'], '/code/check')
+        self.assertEqual(resp.headers['X-Trace-Id'], trace['id'])
+        names = {s['name'] for s in trace['spans']}
+        self.assertTrue({'run_cmd', 'file.write', 'file.delete', 'json.dumps'} <= names)
+        self.assertEqual(set(trace['totals_ms']), {'admission', 'run_cmd', 'file', 'json'})
+        timing = resp.headers['Server-Timing']
+        for part in ('run_cmd;dur=', 'file;dur=', 'json;dur=', 'trace_encode;dur='):
+            self.assertIn(part, timing)
+
+    def test_header_flag_and_app_json_encoding(self):
+        resp = self.client.post('/files/write', json={'path': '/etc/passwd'},
+                                headers={'X-Trace': 'true'})
+        self.assertEqual(resp.status_code, 403)
+        self.assertIn('_trace', resp.get_json())
+        # Same encoder as every other response: compact, sorted keys
+        expected = api.app.json.dumps(resp.get_json()) + '\n'
+        self.assertEqual(resp.get_data(as_text=True), expected)
+
+    def test_store_is_bounded(self):
+        with mock.patch.object(api, 'TRACE_STORE', deque(maxlen=2)), \
+                mock.patch.object(api, 'TRACE_SLOW_MS', 0):
+            ids = [self.client.get('/health', headers={'X-Trace': '1'}).headers['X-Trace-Id']
+                   for _ in range(3)]
+            traces = self.client.get('/debug/traces').get_json()
+            self.assertEqual(traces['capacity'], 2)
+            self.assertEqual(traces['count'], 2)
+            self.assertEqual({t['id'] for t in traces['traces']}, set(ids[1:]))
+
+    def test_only_slow_requests_are_stored(self):
+        with mock.patch.object(api, 'TRACE_STORE', deque(maxlen=10)), \
+                mock.patch.object(api, 'TRACE_SLOW_MS', 60_000):
+            self.client.get('/health?trace=1')
+            self.assertEqual(self.client.get('/debug/traces').get_json()['count'], 0)
+
+class ProfileRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.client.post('/debug/profile', json={'enabled': False, 'sample_rate': 0.1, 'reset': True})
+
+    tearDown = setUp
+
+    def profile_state(self):
+        return self.client.get('/debug/profile').get_json()
+
+    def test_non_boolean_enabled_is_rejected(self):
+        resp = self.client.post('/debug/profile', json={'enabled': 'false'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(self.profile_state()['enabled'])
+
+    def test_bad_field_applies_nothing(self):
+        resp = self.client.post('/debug/profile', json={'enabled': 1, 'sample_rate': 0.5})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/debug/profile', json={'enabled': True, 'sample_rate': 5})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/debug/profile', json={'enabled': True, 'sample_rate': 'x'})
+        self.assertEqual(resp.status_code, 400)
+        state = self.profile_state()
+        self.assertFalse(state['enabled'])
+        self.assertEqual(state['sample_rate'], 0.1)
+
+    def test_sampled_requests_are_profiled(self):
+        resp = self.client.post('/debug/profile', json={'enabled': True, 'sample_rate': 1})
+        self.assertEqual(resp.status_code, 200)
+        self.client.get('/health')
+        state = self.profile_state()
+        self.assertGreaterEqual(state['requests'], 1)
+        self.assertIn('function calls', state['stats'])
+
+    def test_invalid_sort_key_is_rejected(self):
+        self.client.post('/debug/profile', json={'enabled': True, 'sample_rate': 1})
+        self.client.get('/health')
+        self.client.post('/debug/profile', json={'enabled': False})
+        resp = self.client.get('/debug/profile?sort=bogus')
+        self.assertEqual(resp.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()